@@ -12,6 +12,7 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: str = "pdf,jpg,jpeg,png,txt"
     MAX_FILE_SIZE: int = 10485760  # 10MB
     UPLOAD_PATH: str = "uploads/"
+    UPLOAD_CONCURRENCY: int = 16
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = True
@@ -1,6 +1,13 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 from typing import Optional
+import httpx
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 class SupabaseManager:
     def __init__(self):
@@ -10,18 +17,27 @@ class SupabaseManager:
         self._client: Optional[Client] = None
         self._service_client: Optional[Client] = None
 
+    def _create_pooled_client(self, key: str) -> Client:
+        """Create a Supabase client backed by its own keep-alive connection pool"""
+        http_client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            timeout=10.0
+        )
+        return create_client(self.url, key, options=ClientOptions(httpx_client=http_client))
+
     @property
     def client(self) -> Client:
         """Get Supabase client with anon key"""
         if self._client is None:
-            self._client = create_client(self.url, self.anon_key)
+            self._client = self._create_pooled_client(self.anon_key)
         return self._client
 
     @property
     def service_client(self) -> Client:
         """Get Supabase client with service role key for admin operations"""
         if self._service_client is None:
-            self._service_client = create_client(self.url, self.service_role_key)
+            self._service_client = self._create_pooled_client(self.service_role_key)
         return self._service_client
 
     def get_user_client(self, access_token: str, refresh_token: str = None) -> Client:
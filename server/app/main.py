@@ -3,9 +3,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import logging
+import logging.handlers
+import queue
 from app.core.config import settings
 from app.routers import upload, grading, results, auth, admin, student_results   # Added auth
 
+# Configure logging: handlers run on a listener thread so log calls never block the event loop
+log_queue = queue.Queue(-1)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue, log_stream_handler)
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Exam Autograding API",
@@ -39,6 +49,17 @@ app.include_router(results.router, prefix="/api/v1/results", tags=["Results"])
 app.include_router(student_results.router, prefix="/api/v1", tags=["Student"]) 
 
 
+# Started here rather than at import: spawned OCR workers re-import this
+# module and must not each start a listener thread
+@app.on_event("startup")
+async def start_log_listener():
+    log_listener.start()
+
+@app.on_event("shutdown")
+async def shutdown_background_work():
+    await upload.shutdown_pipeline()
+    log_listener.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Exam Autograding API", "status": "running", "version": "1.0.0"}
@@ -14,7 +14,16 @@ from app.schema.exam import (
 )
 
 router = APIRouter()
-grading_service = GradingService()
+
+# Built on first use so importing the router doesn't load the OCR and embedding models
+_grading_service = None
+
+
+def _get_grading_service() -> GradingService:
+    global _grading_service
+    if _grading_service is None:
+        _grading_service = GradingService()
+    return _grading_service
 
 # =====================================================
 # Start Grading Route
@@ -99,6 +108,7 @@ async def grade_upload_async(upload_id: str):
                 continue
             
             # Grade the answer using AI
+            grading_service = _get_grading_service()
             marks, feedback, confidence = await grading_service.grade_answer(
                 question["question_text"],
                 answer["extracted_answer"],
@@ -1,19 +1,55 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
 from fastapi.responses import JSONResponse
-import aiofiles
 import os
+from pathlib import Path
 from uuid import uuid4
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Callable, Awaitable
 from app.database.connection import get_supabase, get_supabase_admin
 from app.core.config import settings
-from app.services.ocr_service import OCRService
+from app.services.ai_service import get_ai_grading_service
+from app.services.ocr_service import parse_answers, read_text_file, run_image_ocr, run_pdf_ocr
 import asyncio
+import functools
+import logging
 import zipfile
-import tempfile
-import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-ocr_service = OCRService()
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+# Allowed upload extensions; 'txt' is always accepted
+ALLOWED_EXT: frozenset = frozenset(ext.strip() for ext in settings.ALLOWED_EXTENSIONS.lower().split(',')) | {'txt'}
+GRADING_CONCURRENCY = 8
+REGRADE_CONCURRENCY = 8
+
+# Background pipeline: uploads wait in a bounded OCR queue, and OCR workers feed
+# a bounded queue drained by grading workers
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+GRADING_WORKERS = 4
+OCR_QUEUE_SIZE = 256
+GRADING_QUEUE_SIZE = 32
+_ocr_queue: Optional[asyncio.Queue] = None
+_grading_queue: Optional[asyncio.Queue] = None
+_pipeline_workers: List[asyncio.Task] = []
+# Puts waiting for room in a full OCR queue, so the request that queued them can return
+_deferred_puts: Set[asyncio.Task] = set()
+
+# Bounds concurrent grade_question calls process-wide
+_grading_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _new_ocr_pool() -> ProcessPoolExecutor:
+    # Spawned so each worker process loads its own OCR models
+    return ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+# OCR runs in separate processes to escape the GIL
+_ocr_pool = _new_ocr_pool()
+
 
 # app/routers/upload.py (UPDATE ONLY THE STUDENT LOOKUP PART)
 
@@ -26,17 +62,10 @@ async def batch_upload_exam_papers(
     supabase_client = Depends(get_supabase)
 ):
     """Batch upload multiple exam papers by teacher"""
-    print(f"\n{'='*60}")
-    print(f"🚀 BATCH UPLOAD STARTED")
-    print(f"{'='*60}")
-    print(f"Exam ID: {exam_id}")
-    print(f"Teacher ID: {teacher_id}")
-    print(f"Number of files: {len(files)}")
-    print(f"Student IDs received: {student_ids}")
+    logger.info("Batch upload started: exam=%s teacher=%s files=%d", exam_id, teacher_id, len(files))
     # Parse student IDs
     student_id_list = [sid.strip() for sid in student_ids.split(',')]
-    print(f"Parsed student IDs: {student_id_list}")
-    print(f"Number of student IDs: {len(student_id_list)}")
+    logger.debug("Parsed %d student IDs: %s", len(student_id_list), student_id_list)
 
     if len(files) != len(student_id_list):
         raise HTTPException(
@@ -49,129 +78,45 @@ async def batch_upload_exam_papers(
     if not exam_result.data:
         raise HTTPException(status_code=404, detail="Exam not found")
 
-    print(f"✅ Exam verified: {exam_result.data[0].get('exam_name', 'Unknown')}")
+    logger.debug("Exam verified: %s", exam_result.data[0].get('exam_name', 'Unknown'))
 
     upload_results = []
     failed_uploads = []
+
+    # Look up all students in one query instead of one per file
+    student_result = supabase_client.table("students").select("id, student_id, full_name").in_("student_id", list(set(student_id_list))).execute()
+    students_by_id = {row["student_id"]: row for row in (student_result.data or [])}
+    logger.debug("Students found: %d of %d", len(students_by_id), len(set(student_id_list)))
     
-    for idx, (file, student_id) in enumerate(zip(files, student_id_list)):
-        try:
-            # ✅ IMPROVED: Better student lookup with error handling
-            print(f"Looking up student: {student_id}")
-            
-            student_result = supabase_client.table("students").select("id, student_id, full_name").eq("student_id", student_id).execute()
-            
-            print(f"Student lookup result: {student_result.data}")
-            
-            if not student_result.data or len(student_result.data) == 0:
-                print(f"❌ Student not found: {student_id}")
-                failed_uploads.append({
-                    "file": file.filename,
-                    "student_id": student_id,
-                    "error": f"Student with ID '{student_id}' not found in database"
-                })
-                continue
-            
-            student_uuid = student_result.data[0]["id"]
-            print(f"✅ Found student: {student_result.data[0]['full_name']} (UUID: {student_uuid})")
-            
-            # Validate file
-            if not file.filename:
-                failed_uploads.append({
-                    "file": "unknown",
-                    "student_id": student_id,
-                    "error": "No filename provided"
-                })
-                continue
-            
-            file_extension = file.filename.split('.')[-1].lower()
-            
-            # ✅ IMPROVED: Add 'txt' to allowed extensions if missing
-            allowed_extensions = settings.ALLOWED_EXTENSIONS.split(',')
-            if 'txt' not in allowed_extensions:
-                allowed_extensions.append('txt')
-            
-            if file_extension not in allowed_extensions:
-                failed_uploads.append({
-                    "file": file.filename,
-                    "student_id": student_id,
-                    "error": f"Invalid file type: {file_extension}. Allowed: {', '.join(allowed_extensions)}"
-                })
-                continue
-            
-            # Read file content
-            content = await file.read()
-            await file.seek(0)
-            
-            if len(content) > settings.MAX_FILE_SIZE:
-                failed_uploads.append({
-                    "file": file.filename,
-                    "student_id": student_id,
-                    "error": f"File too large: {len(content)} bytes (max: {settings.MAX_FILE_SIZE})"
-                })
-                continue
-            
-            # Generate unique filename
-            unique_filename = f"{uuid4()}.{file_extension}"
-            file_path = f"{settings.UPLOAD_PATH}{exam_id}/{student_id}/{unique_filename}"
-            
-            # Create directory
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(content)
-            
-            print(f"✅ File saved: {file_path}")
-            
-            # Create upload record
-            upload_data = {
-                "exam_id": exam_id,
-                "student_id": student_uuid,
-                "uploaded_by_teacher_id": teacher_id,
-                "file_name": file.filename,
-                "file_path": file_path,
-                "file_size": len(content),
-                "file_type": file_extension,
-                "processing_status": "uploaded"
-            }
-            
-            result = supabase_client.table("exam_uploads").insert(upload_data).execute()
-            
-            if not result.data:
-                raise Exception("Failed to create upload record")
-            
-            upload_id = result.data[0]["id"]
-            print(f"✅ Upload record created: {upload_id}")
-            
-            # Start OCR processing in background
-            asyncio.create_task(process_upload_async(upload_id, file_path, file_extension))
-            
-            upload_results.append({
-                "upload_id": upload_id,
-                "student_id": student_id,
-                "file_name": file.filename,
-                "status": "processing"
-            })
-            
-        except Exception as e:
-            print(f"❌ Error processing file {file.filename}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            
-            failed_uploads.append({
-                "file": file.filename,
-                "student_id": student_id,
-                "error": str(e)
-            })
+    # Student directories are created on demand, once per student, by _validate_and_save
+    exam_upload_dir = Path(settings.UPLOAD_PATH) / exam_id
+    student_dirs = {}
+    upload_semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY or 16)
+    
+    # Validate and save all files concurrently
+    results = await asyncio.gather(
+        *[
+            _validate_and_save(
+                f.filename, sid, students_by_id.get(sid), _declared_size(f),
+                functools.partial(_save_upload, f, max_size=settings.MAX_FILE_SIZE),
+                exam_id, teacher_id, exam_upload_dir, student_dirs, upload_semaphore
+            )
+            for f, sid in zip(files, student_id_list)
+        ],
+        return_exceptions=True
+    )
+    
+    upload_rows, pending_files = _partition_save_results(
+        [(f.filename, sid) for f, sid in zip(files, student_id_list)], results, failed_uploads
+    )
     
-    print(f"\n{'='*60}")
-    print(f"📊 UPLOAD SUMMARY")
-    print(f"{'='*60}")
-    print(f"Total files: {len(files)}")
-    print(f"Successful: {len(upload_results)}")
-    print(f"Failed: {len(failed_uploads)}")
-    print(f"{'='*60}\n")
+    # Create all upload records in one insert
+    await _insert_upload_records(supabase_client, upload_rows, pending_files, upload_results, failed_uploads)
+    
+    logger.info(
+        "Batch upload finished: exam=%s total=%d successful=%d failed=%d",
+        exam_id, len(files), len(upload_results), len(failed_uploads)
+    )
     return {
         "exam_id": exam_id,
         "total_files": len(files),
@@ -206,116 +151,64 @@ async def upload_exam_papers_zip(
     upload_results = []
     failed_uploads = []
     
-    # Create temp directory
-    temp_dir = tempfile.mkdtemp()
+    # Read the archive index off the event loop; members are streamed straight
+    # from the uploaded file so nothing is extracted to a temp directory
+    try:
+        zip_ref = await asyncio.to_thread(zipfile.ZipFile, zip_file.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid ZIP archive")
     
     try:
-        # Save ZIP file temporarily
-        zip_path = os.path.join(temp_dir, "upload.zip")
-        content = await zip_file.read()
-        
-        async with aiofiles.open(zip_path, 'wb') as f:
-            await f.write(content)
-        
-        # Extract ZIP
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        # Process each file
-        for root, dirs, files in os.walk(temp_dir):
-            for filename in files:
-                if filename == "upload.zip" or filename.startswith('.'):
-                    continue
-                
-                try:
-                    # Parse student ID from filename (format: studentID_filename.ext)
-                    if '_' not in filename:
-                        failed_uploads.append({
-                            "file": filename,
-                            "error": "Invalid filename format. Expected: studentID_filename.ext"
-                        })
-                        continue
-                    
-                    student_id = filename.split('_')[0]
-                    file_path_temp = os.path.join(root, filename)
-                    
-                    # Verify student exists
-                    student_result = supabase_client.table("students").select("id").eq("student_id", student_id).execute()
-                    if not student_result.data:
-                        failed_uploads.append({
-                            "file": filename,
-                            "student_id": student_id,
-                            "error": "Student not found"
-                        })
-                        continue
-                    
-                    student_uuid = student_result.data[0]["id"]
-                    
-                    # Validate file extension
-                    file_extension = filename.split('.')[-1].lower()
-                    if file_extension not in settings.ALLOWED_EXTENSIONS.split(','):
-                        failed_uploads.append({
-                            "file": filename,
-                            "student_id": student_id,
-                            "error": "Invalid file type"
-                        })
-                        continue
-                    
-                    # Read file
-                    async with aiofiles.open(file_path_temp, 'rb') as f:
-                        file_content = await f.read()
-                    
-                    if len(file_content) > settings.MAX_FILE_SIZE:
-                        failed_uploads.append({
-                            "file": filename,
-                            "student_id": student_id,
-                            "error": "File too large"
-                        })
-                        continue
-                    
-                    # Generate unique filename and save
-                    unique_filename = f"{uuid4()}.{file_extension}"
-                    final_path = f"{settings.UPLOAD_PATH}{exam_id}/{student_id}/{unique_filename}"
-                    
-                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
-                    
-                    async with aiofiles.open(final_path, 'wb') as f:
-                        await f.write(file_content)
-                    
-                    # Create upload record
-                    upload_data = {
-                        "exam_id": exam_id,
-                        "student_id": student_uuid,
-                        "uploaded_by_teacher_id": teacher_id,
-                        "file_name": filename,
-                        "file_path": final_path,
-                        "file_size": len(file_content),
-                        "file_type": file_extension,
-                        "processing_status": "uploaded"
-                    }
-                    
-                    result = supabase_client.table("exam_uploads").insert(upload_data).execute()
-                    upload_id = result.data[0]["id"]
-                    
-                    # Start OCR processing
-                    asyncio.create_task(process_upload_async(upload_id, final_path, file_extension))
-                    
-                    upload_results.append({
-                        "upload_id": upload_id,
-                        "student_id": student_id,
-                        "file_name": filename,
-                        "status": "processing"
-                    })
-                    
-                except Exception as e:
-                    failed_uploads.append({
-                        "file": filename,
-                        "error": str(e)
-                    })
-        
+        # Parse student IDs from member names (format: studentID_filename.ext)
+        entries = []
+        for info in zip_ref.infolist():
+            filename = os.path.basename(info.filename)
+            if info.is_dir() or not filename or filename.startswith('.'):
+                continue
+            
+            if '_' not in filename:
+                failed_uploads.append({
+                    "file": filename,
+                    "error": "Invalid filename format. Expected: studentID_filename.ext"
+                })
+                continue
+            
+            entries.append((filename, info, filename.split('_')[0]))
+        
+        # Verify all students in one query
+        zip_student_ids = list({student_id for _, _, student_id in entries})
+        students_by_id = {}
+        if zip_student_ids:
+            student_result = supabase_client.table("students").select("id, student_id").in_("student_id", zip_student_ids).execute()
+            students_by_id = {row["student_id"]: row for row in (student_result.data or [])}
+        
+        # Student directories are created on demand, once per student, by _validate_and_save
+        exam_upload_dir = Path(settings.UPLOAD_PATH) / exam_id
+        student_dirs = {}
+        upload_semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY or 16)
+        
+        # Validate and save all members concurrently; the archive header size
+        # is not trusted, so the copy enforces the limit too
+        results = await asyncio.gather(
+            *[
+                _validate_and_save(
+                    filename, student_id, students_by_id.get(student_id), info.file_size,
+                    functools.partial(asyncio.to_thread, _copy_zip_member, zip_ref, info),
+                    exam_id, teacher_id, exam_upload_dir, student_dirs, upload_semaphore
+                )
+                for filename, info, student_id in entries
+            ],
+            return_exceptions=True
+        )
     finally:
-        # Cleanup temp directory
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        zip_ref.close()
+    
+    upload_rows, pending_files = _partition_save_results(
+        [(filename, student_id) for filename, _, student_id in entries], results, failed_uploads
+    )
+    
+    # Create all upload records in one insert
+    await _insert_upload_records(supabase_client, upload_rows, pending_files, upload_results, failed_uploads)
     
     return {
         "exam_id": exam_id,
@@ -327,41 +220,327 @@ async def upload_exam_papers_zip(
     }
 
 
-async def process_upload_async(upload_id: str, file_path: str, file_extension: str):
-    """Background task to process uploaded file and trigger grading"""
+def _declared_size(file: UploadFile) -> Optional[int]:
+    """Size reported for an uploaded file, if the client or framework provided one"""
+    size = getattr(file, "size", None)
+    if size is not None:
+        return size
+    content_length = file.headers.get("content-length") if file.headers else None
+    return int(content_length) if content_length and content_length.isdigit() else None
+
+
+def _sync_copy_stream(src, path: str, max_size: int = None) -> int:
+    """Copy a file object to path in chunks, stopping once max_size is exceeded"""
+    size = 0
+    with open(path, 'wb') as dst:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                break
+            dst.write(chunk)
+    return size
+
+
+async def _save_upload(file: UploadFile, path: str, max_size: int = None) -> int:
+    """Save an uploaded file to disk in a single worker thread, returning its size"""
+    return await asyncio.to_thread(_sync_copy_stream, file.file, path, max_size)
+
+
+def _copy_zip_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, path: str) -> int:
+    """Stream a single ZIP member to path, stopping once MAX_FILE_SIZE is exceeded"""
+    with zip_ref.open(info) as src:
+        return _sync_copy_stream(src, path, settings.MAX_FILE_SIZE)
+
+
+async def _validate_and_save(
+    file_name: Optional[str],
+    student_id: str,
+    student: Optional[Dict[str, Any]],
+    declared_size: Optional[int],
+    save: Callable[[str], Awaitable[int]],
+    exam_id: str,
+    teacher_id: str,
+    exam_upload_dir: Path,
+    student_dirs: Dict[str, asyncio.Task],
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """
+    Validate a single uploaded file and save it with save(path), which returns the bytes written.
+    student_dirs tracks the per-request directory creation so each student's directory is made once.
+    Returns {"failure": ...} or {"upload_row": ..., "pending": ...}.
+    """
+    async with semaphore:
+        if not student:
+            logger.debug("Student not found: %s", student_id)
+            return {"failure": {
+                "file": file_name,
+                "student_id": student_id,
+                "error": f"Student with ID '{student_id}' not found in database"
+            }}
+        
+        # Validate file
+        if not file_name:
+            return {"failure": {
+                "file": "unknown",
+                "student_id": student_id,
+                "error": "No filename provided"
+            }}
+        
+        file_extension = file_name.split('.')[-1].lower()
+        
+        if file_extension not in ALLOWED_EXT:
+            return {"failure": {
+                "file": file_name,
+                "student_id": student_id,
+                "error": f"Invalid file type: {file_extension}. Allowed: {', '.join(sorted(ALLOWED_EXT))}"
+            }}
+        
+        # Reject on declared size before touching the body or the disk
+        if declared_size is not None and declared_size > settings.MAX_FILE_SIZE:
+            return {"failure": {
+                "file": file_name,
+                "student_id": student_id,
+                "error": f"File too large: {declared_size} bytes (max: {settings.MAX_FILE_SIZE})"
+            }}
+        
+        # Create the student's directory only once a file for it has passed validation
+        if student_id not in student_dirs:
+            student_dirs[student_id] = asyncio.ensure_future(asyncio.to_thread(
+                (exam_upload_dir / student_id).mkdir, parents=True, exist_ok=True
+            ))
+        await student_dirs[student_id]
+        
+        # Generate unique filename
+        unique_filename = f"{uuid4()}.{file_extension}"
+        file_path = (exam_upload_dir / student_id / unique_filename).as_posix()
+        
+        # Stream file to disk in chunks instead of buffering the whole body
+        try:
+            size = await save(file_path)
+        except Exception:
+            # Don't leave a partial file behind on a failed write
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        if size > settings.MAX_FILE_SIZE:
+            os.remove(file_path)
+            return {"failure": {
+                "file": file_name,
+                "student_id": student_id,
+                "error": f"File too large (max: {settings.MAX_FILE_SIZE} bytes)"
+            }}
+        
+        logger.debug("File saved: %s", file_path)
+        
+        return {
+            "upload_row": {
+                "exam_id": exam_id,
+                "student_id": student["id"],
+                "uploaded_by_teacher_id": teacher_id,
+                "file_name": file_name,
+                "file_path": file_path,
+                "file_size": size,
+                "file_type": file_extension,
+                "processing_status": "uploaded"
+            },
+            "pending": (student_id, file_name, file_path, file_extension)
+        }
+
+
+def _partition_save_results(items, results, failed_uploads):
+    """
+    Split _validate_and_save results (aligned with (file_name, student_id) items) into
+    upload rows and pending files for the batched insert, recording failures.
+    """
+    upload_rows = []
+    pending_files = []
+    
+    for (file_name, student_id), result in zip(items, results):
+        if isinstance(result, Exception):
+            logger.error("Error processing file %s: %s", file_name, result, exc_info=result)
+            failed_uploads.append({
+                "file": file_name,
+                "student_id": student_id,
+                "error": str(result)
+            })
+        elif "failure" in result:
+            failed_uploads.append(result["failure"])
+        else:
+            upload_rows.append(result["upload_row"])
+            pending_files.append(result["pending"])
+    
+    return upload_rows, pending_files
+
+
+async def _insert_upload_records(supabase_client, upload_rows, pending_files, upload_results, failed_uploads):
+    """Insert all upload records in one request and start OCR processing for each"""
+    if not upload_rows:
+        return
+    
+    try:
+        result = supabase_client.table("exam_uploads").insert(upload_rows).execute()
+        if not result.data or len(result.data) != len(upload_rows):
+            raise Exception("Failed to create upload records")
+    except Exception as e:
+        logger.exception("Error creating upload records")
+        for student_id, file_name, file_path, _ in pending_files:
+            # Without a row the saved file is orphaned
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            failed_uploads.append({
+                "file": file_name,
+                "student_id": student_id,
+                "error": str(e)
+            })
+        return
+    
+    # Returned rows keep the order of the inserted rows
+    for row, (student_id, file_name, file_path, file_extension) in zip(result.data, pending_files):
+        upload_id = row["id"]
+        logger.debug("Upload record created: %s", upload_id)
+        
+        # Queue for background OCR and grading
+        _enqueue_upload(upload_id, file_path, file_extension)
+        
+        upload_results.append({
+            "upload_id": upload_id,
+            "student_id": student_id,
+            "file_name": file_name,
+            "status": "processing"
+        })
+
+
+def _ensure_pipeline_workers():
+    """Start the OCR and grading worker pools on first use (requires a running event loop)"""
+    global _ocr_queue, _grading_queue
+    if _ocr_queue is not None:
+        return
+    
+    _ocr_queue = asyncio.Queue(maxsize=OCR_QUEUE_SIZE)
+    _grading_queue = asyncio.Queue(maxsize=GRADING_QUEUE_SIZE)
+    for _ in range(OCR_WORKERS):
+        _pipeline_workers.append(asyncio.create_task(_ocr_worker()))
+    for _ in range(GRADING_WORKERS):
+        _pipeline_workers.append(asyncio.create_task(_grading_worker()))
+
+
+def _enqueue_upload(upload_id: str, file_path: str, file_extension: str):
+    """
+    Queue an upload for OCR without blocking the caller; it moves on to grading once its text is extracted.
+    When the queue is full the put waits in a background task instead of holding up the HTTP response.
+    """
+    _ensure_pipeline_workers()
+    item = (upload_id, file_path, file_extension)
+    try:
+        _ocr_queue.put_nowait(item)
+    except asyncio.QueueFull:
+        logger.debug("OCR queue full, deferring upload %s", upload_id)
+        task = asyncio.create_task(_ocr_queue.put(item))
+        _deferred_puts.add(task)
+        task.add_done_callback(_deferred_puts.discard)
+
+
+async def shutdown_pipeline():
+    """Stop the OCR and grading workers and the OCR process pool"""
+    if _ocr_queue is not None:
+        pending = _ocr_queue.qsize() + _grading_queue.qsize() + len(_deferred_puts)
+        if pending:
+            logger.warning(
+                "Shutting down with %d uploads still queued (OCR: %d, deferred: %d, grading: %d); they stay in their current status",
+                pending, _ocr_queue.qsize(), len(_deferred_puts), _grading_queue.qsize()
+            )
+    
+    tasks = [*_deferred_puts, *_pipeline_workers]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _pipeline_workers.clear()
+    
+    shutdown_ocr_pool()
+
+
+async def _ocr_worker():
+    """Run OCR for queued uploads and hand successful ones to the grading workers"""
+    while True:
+        upload_id, file_path, file_extension = await _ocr_queue.get()
+        try:
+            if await process_upload_async(upload_id, file_path, file_extension):
+                await _grading_queue.put(upload_id)
+        except Exception:
+            logger.exception("OCR worker failed on upload %s", upload_id)
+        finally:
+            _ocr_queue.task_done()
+
+
+async def _grading_worker():
+    """Grade uploads whose OCR has completed"""
+    supabase_admin = get_supabase_admin()
+    while True:
+        upload_id = await _grading_queue.get()
+        try:
+            await auto_grade_upload(upload_id, supabase_admin)
+        except Exception:
+            logger.exception("Grading worker failed on upload %s", upload_id)
+        finally:
+            _grading_queue.task_done()
+
+
+async def _run_in_ocr_pool(func, file_path: str) -> Dict[str, Any]:
+    """Run an OCR entry point in the process pool, replacing the pool if a worker died"""
+    global _ocr_pool
+    pool = _ocr_pool
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, file_path)
+    except BrokenProcessPool:
+        # A crashed worker (e.g. OOM while loading models) breaks the whole pool;
+        # replace it so later uploads can still be processed
+        if _ocr_pool is pool:
+            logger.error("OCR process pool broke; starting a new one")
+            _ocr_pool = _new_ocr_pool()
+            pool.shutdown(wait=False)
+        raise
+
+
+def shutdown_ocr_pool():
+    """Stop the OCR worker processes"""
+    _ocr_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def process_upload_async(upload_id: str, file_path: str, file_extension: str) -> bool:
+    """Run OCR on an uploaded file, returning True when it is ready for grading"""
     supabase_admin = get_supabase_admin()
     
     try:
-        print(f"\n{'='*60}")
-        print(f"🔄 PROCESSING UPLOAD: {upload_id}")
-        print(f"{'='*60}")
+        logger.info("Processing upload %s", upload_id)
         
         # Update status to processing
         supabase_admin.table("exam_uploads").update({
             "processing_status": "processing"
         }).eq("id", upload_id).execute()
         
-        print(f"📄 Reading file: {file_path}")
+        logger.debug("Reading file: %s", file_path)
         
-        # Read file based on type
+        # Run OCR in the process pool so CPU-bound work stays off the event loop
         if file_extension == 'txt':
-            ocr_result = await ocr_service.extract_text_from_txt(file_path)
+            ocr_result = await asyncio.to_thread(read_text_file, file_path)
         elif file_extension == 'pdf':
-            async with aiofiles.open(file_path, 'rb') as f:
-                file_content = await f.read()
-            ocr_result = await ocr_service.extract_text_from_pdf(file_content)
+            ocr_result = await _run_in_ocr_pool(run_pdf_ocr, file_path)
         else:
-            async with aiofiles.open(file_path, 'rb') as f:
-                file_content = await f.read()
-            ocr_result = await ocr_service.extract_text_from_image(file_content)
+            ocr_result = await _run_in_ocr_pool(run_image_ocr, file_path)
         
-        print(f"📝 OCR Result: {ocr_result['status']}")
-        print(f"📊 Confidence: {ocr_result.get('confidence', 0.0)}")
-        print(f"📄 Text preview: {ocr_result['text'][:100]}...")
+        logger.debug(
+            "OCR result for %s: status=%s confidence=%s preview=%r",
+            upload_id, ocr_result['status'], ocr_result.get('confidence', 0.0), ocr_result['text'][:100]
+        )
         
         # Check if OCR was successful
         if ocr_result["status"] != "success" or not ocr_result["text"].strip():
-            print(f"❌ OCR failed: No text extracted")
+            logger.warning("OCR failed for upload %s: no text extracted", upload_id)
             supabase_admin.table("exam_uploads").update({
                 "processing_status": "failed",
                 "error_message": "No text extracted",
@@ -369,7 +548,7 @@ async def process_upload_async(upload_id: str, file_path: str, file_extension: s
                 "confidence_score": ocr_result.get("confidence", 0.0),
                 "processed_at": "now()"
             }).eq("id", upload_id).execute()
-            return
+            return False
         
         # Update with OCR results
         supabase_admin.table("exam_uploads").update({
@@ -379,174 +558,195 @@ async def process_upload_async(upload_id: str, file_path: str, file_extension: s
             "processed_at": "now()"
         }).eq("id", upload_id).execute()
         
-        print(f"✅ OCR completed successfully")
-        
-        # Now trigger auto-grading
-        print(f"🤖 Starting auto-grading...")
-        await auto_grade_upload(upload_id, supabase_admin)
+        logger.debug("OCR completed for upload %s", upload_id)
+        return True
         
     except Exception as e:
-        print(f"❌ Error processing upload {upload_id}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing upload %s", upload_id)
         
         supabase_admin.table("exam_uploads").update({
             "processing_status": "failed",
             "error_message": str(e)
         }).eq("id", upload_id).execute()
+        return False
 
 
-async def auto_grade_upload(upload_id: str, supabase_admin):
-    """Automatically grade an upload after OCR processing"""
-    try:
-        print(f"\n{'='*60}")
-        print(f"🎓 AUTO-GRADING UPLOAD: {upload_id}")
-        print(f"{'='*60}")
-        
-        # Get upload details first
-        upload_result = supabase_admin.table("exam_uploads").select("*").eq("id", upload_id).execute()
-        
-        if not upload_result.data:
-            print(f"❌ Upload {upload_id} not found")
-            return
-        
-        upload = upload_result.data[0]
-        exam_id = upload.get("exam_id")
-        
-        if not exam_id:
-            print(f"❌ No exam_id in upload record")
-            return
-        
-        print(f"📋 Exam ID: {exam_id}")
-        
-        # Get exam details
-        exam_result = supabase_admin.table("exams").select(
-            "id, exam_name, total_marks"
-        ).eq("id", exam_id).execute()
-        
-        if not exam_result.data:
-            print(f"❌ Exam {exam_id} not found")
-            return
-        
-        exam = exam_result.data[0]
-        print(f"📋 Exam: {exam['exam_name']}")
-        
-        # Get questions separately
-        questions_result = supabase_admin.table("questions").select(
-            "id, question_number, question_text, max_marks, marking_scheme, sample_answer, keywords"
-        ).eq("exam_id", exam_id).order("question_number").execute()
-        
-        questions = questions_result.data if questions_result.data else []
-        
-        if not questions:
-            print(f"❌ No questions found for exam {exam_id}")
-            print(f"Debug: Checking if questions table has any data...")
-            
-            # Debug: Check if questions exist at all
-            all_questions = supabase_admin.table("questions").select("id, exam_id").limit(5).execute()
-            print(f"Sample questions in database: {all_questions.data}")
-            
-            # Check if this specific exam has questions
-            exam_questions_check = supabase_admin.table("questions").select("count").eq("exam_id", exam_id).execute()
-            print(f"Questions count for exam {exam_id}: {exam_questions_check}")
-            
-            return
-        
-        print(f"📝 Questions found: {len(questions)}")
-        
-        ocr_text = upload.get("ocr_extracted_text", "")
-        
-        if not ocr_text:
-            print(f"❌ No OCR text found")
-            return
-        
-        print(f"📄 OCR Text preview: {ocr_text[:200]}...")
-        
-        # Parse answers from OCR text
-        parsed_answers = ocr_service._parse_answers_botanical(ocr_text)
-        
-        print(f"✅ Parsed {len(parsed_answers)} answers: {list(parsed_answers.keys())}")
-        
-        # Grade each question
-        from app.services.ai_service import AIGradingService
-        ai_service = AIGradingService()
-        
-        graded_count = 0
-        
-        for question in questions:
-            question_key = f"question_{question['question_number']}"
-            student_answer = parsed_answers.get(question_key, "")
-            
-            print(f"\n{'─'*60}")
-            print(f"📝 Question {question['question_number']}")
-            
-            if not student_answer:
-                print(f"⚠️  No answer found for {question_key}")
-                continue
-            
-            print(f"   Answer preview: {student_answer[:100]}...")
-            
-            # Prepare question data for grading
-            question_data = {
-                "question": question["question_text"],
-                "model_answer": question.get("sample_answer", ""),
-                "marks": float(question["max_marks"]),
-                "question_number": question["question_number"],
-                "keywords": question.get("keywords", []) if question.get("keywords") else [],
-                "type": "descriptive"
-            }
-            
-            # Grade the question
-            print(f"   🤖 Grading in progress...")
-            result = await ai_service.grade_question(question_data, student_answer)
-            
-            # Save student answer
-            answer_data = {
-                "upload_id": upload_id,
-                "question_id": question["id"],
-                "student_id": upload["student_id"],
-                "extracted_answer": student_answer,
-                "confidence_score": float(result.confidence_score)
-            }
-            
-            answer_result = supabase_admin.table("student_answers").insert(answer_data).execute()
-            
-            if not answer_result.data:
-                print(f"   ❌ Failed to save answer")
-                continue
-            
-            # Save grading result
-            grading_data = {
-                "student_answer_id": answer_result.data[0]["id"],
-                "exam_id": exam["id"],
-                "student_id": upload["student_id"],
-                "question_id": question["id"],
-                "ai_assigned_marks": float(result.marks_obtained),
-                "final_marks": float(result.marks_obtained),
-                "ai_feedback": result.feedback,
-                "similarity_score": 0.0,
-                "ai_confidence": float(result.confidence_score),
-                "is_reviewed_by_teacher": False
-            }
-            
-            supabase_admin.table("grading_results").insert(grading_data).execute()
-            
-            print(f"   ✅ Marks: {result.marks_obtained}/{question['max_marks']}")
-            print(f"   💬 Feedback: {result.feedback[:100]}...")
-            
-            graded_count += 1
-        
-        print(f"\n{'='*60}")
-        print(f"🎉 GRADING COMPLETE")
-        print(f"{'='*60}")
-        print(f"Total questions: {len(questions)}")
-        print(f"Graded: {graded_count}")
-        print(f"{'='*60}\n")
+def _get_grading_semaphore() -> asyncio.Semaphore:
+    """Semaphore shared by all grading calls (created on first use, inside the event loop)"""
+    global _grading_semaphore
+    if _grading_semaphore is None:
+        _grading_semaphore = asyncio.Semaphore(GRADING_CONCURRENCY)
+    return _grading_semaphore
+
+
+def _get_exam_and_questions(exam_id: str, supabase_admin):
+    """Fetch an exam with its questions ordered by question number"""
+    exam_result = supabase_admin.table("exams").select(
+        "id, exam_name, total_marks, questions(id, question_number, question_text, max_marks, marking_scheme, sample_answer, keywords)"
+    ).eq("id", exam_id).order("question_number", foreign_table="questions").execute()
+    
+    if not exam_result.data:
+        return None, []
+    
+    exam = exam_result.data[0]
+    questions = exam.pop("questions", None) or []
+    return exam, questions
+
+
+async def auto_grade_upload(upload_id: str, supabase_admin, exam: Dict[str, Any] = None, questions: List[Dict[str, Any]] = None) -> bool:
+    """
+    Automatically grade an upload after OCR processing.
+    Returns True if any answers were graded; errors propagate to the caller.
+    """
+    logger.debug("Auto-grading upload %s", upload_id)
+    
+    # Supabase calls are synchronous, so they run in worker threads to let
+    # concurrent regrades overlap their round-trips
+    if exam is not None and questions is not None:
+        # Caller already has the exam and questions; only the upload is needed
+        upload_query = supabase_admin.table("exam_uploads").select("*").eq("id", upload_id)
+    else:
+        # Get upload, exam and ordered questions in a single embedded select
+        upload_query = supabase_admin.table("exam_uploads").select(
+            "*, exams(id, exam_name, total_marks, questions(id, question_number, question_text, max_marks, marking_scheme, sample_answer, keywords))"
+        ).eq("id", upload_id).order("question_number", foreign_table="exams.questions")
+    upload_result = await asyncio.to_thread(upload_query.execute)
+    
+    if not upload_result.data:
+        logger.warning("Upload %s not found", upload_id)
+        return False
+    
+    upload = upload_result.data[0]
+    exam_id = upload.get("exam_id")
+    
+    if not exam_id:
+        logger.warning("No exam_id in upload record %s", upload_id)
+        return False
+    
+    if exam is None or questions is None:
+        exam = upload.pop("exams", None)
+        questions = (exam or {}).pop("questions", None) or []
+    
+    if not exam:
+        logger.warning("Exam %s not found", exam_id)
+        return False
+    
+    logger.debug("Exam: %s (%s)", exam['exam_name'], exam_id)
+    
+    if not questions:
+        logger.warning("No questions found for exam %s", exam_id)
+        return False
+    
+    logger.debug("Questions found: %d", len(questions))
+    
+    ocr_text = upload.get("ocr_extracted_text", "")
+    
+    if not ocr_text:
+        logger.warning("No OCR text found for upload %s", upload_id)
+        return False
+    
+    # Parse answers from OCR text
+    parsed_answers = parse_answers(ocr_text)
+    
+    logger.debug("Parsed %d answers: %s", len(parsed_answers), list(parsed_answers.keys()))
+    
+    # Key answers by question number once instead of building a key per question
+    parsed_by_int = {int(k.split("_", 1)[1]): v for k, v in parsed_answers.items()}
+    
+    # Pair each answered question with its grading input
+    pairs = []
+    
+    for question in questions:
+        student_answer = parsed_by_int.get(question["question_number"], "")
+        
+        if not student_answer:
+            logger.debug("No answer found for question %s", question["question_number"])
+            continue
+        
+        # Prepare question data for grading
+        question_data = {
+            "question": question["question_text"],
+            "model_answer": question.get("sample_answer", ""),
+            "marks": float(question["max_marks"]),
+            "question_number": question["question_number"],
+            "keywords": question.get("keywords", []) if question.get("keywords") else [],
+            "type": "descriptive"
+        }
+        pairs.append((question, question_data, student_answer))
+    
+    # Grade all questions concurrently; the shared semaphore bounds grading
+    # calls across every upload being processed
+    grading_semaphore = _get_grading_semaphore()
+    
+    async def _sem_wrap(question_data, student_answer):
+        async with grading_semaphore:
+            return await get_ai_grading_service().grade_question(question_data, student_answer)
+    
+    logger.debug("Grading %d answers", len(pairs))
+    results = await asyncio.gather(
+        *[_sem_wrap(question_data, student_answer) for _, question_data, student_answer in pairs],
+        return_exceptions=True
+    )
+    
+    answer_rows = []
+    pending_grading = []
+    
+    for (question, _, student_answer), result in zip(pairs, results):
+        if isinstance(result, Exception):
+            logger.error(
+                "Grading question %s of upload %s failed: %s",
+                question['question_number'], upload_id, result, exc_info=result
+            )
+            continue
+        
+        # Queue student answer and grading result for the batched inserts
+        answer_rows.append({
+            "upload_id": upload_id,
+            "question_id": question["id"],
+            "student_id": upload["student_id"],
+            "extracted_answer": student_answer,
+            "confidence_score": float(result.confidence_score)
+        })
+        
+        pending_grading.append({
+            "exam_id": exam["id"],
+            "student_id": upload["student_id"],
+            "question_id": question["id"],
+            "ai_assigned_marks": float(result.marks_obtained),
+            "final_marks": float(result.marks_obtained),
+            "ai_feedback": result.feedback,
+            "similarity_score": 0.0,
+            "ai_confidence": float(result.confidence_score),
+            "is_reviewed_by_teacher": False
+        })
+        
+        logger.debug("Question %s: %s/%s", question['question_number'], result.marks_obtained, question['max_marks'])
+    
+    graded_count = 0
+    
+    if answer_rows:
+        # Save all student answers in one insert
+        answers_result = await asyncio.to_thread(
+            supabase_admin.table("student_answers").insert(answer_rows).execute
+        )
         
-    except Exception as e:
-        print(f"❌ Error in auto-grading: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if not answers_result.data:
+            logger.error("Failed to save answers for upload %s", upload_id)
+        else:
+            # Link each grading result to its saved answer
+            answer_ids = {row["question_id"]: row["id"] for row in answers_result.data}
+            grading_rows = [
+                {"student_answer_id": answer_ids[grading["question_id"]], **grading}
+                for grading in pending_grading
+                if grading["question_id"] in answer_ids
+            ]
+            
+            if grading_rows:
+                await asyncio.to_thread(supabase_admin.table("grading_results").insert(grading_rows).execute)
+            graded_count = len(grading_rows)
+    
+    logger.info("Grading complete for upload %s: %d of %d questions graded", upload_id, graded_count, len(questions))
+    return graded_count > 0
 
 @router.get("/upload/exam/{exam_id}/status")
 async def get_exam_upload_status(exam_id: str, supabase_client = Depends(get_supabase)):
@@ -617,27 +817,22 @@ async def reprocess_upload(upload_id: str):
         
         upload = upload_result.data[0]
         
-        print(f"\n{'='*60}")
-        print(f"🔄 MANUAL REPROCESSING: {upload_id}")
-        print(f"{'='*60}")
-        print(f"Student ID: {upload['student_id']}")
-        print(f"Exam ID: {upload['exam_id']}")
-        print(f"File: {upload['file_path']}")
-        print(f"Current status: {upload['processing_status']}")
+        logger.info(
+            "Manual reprocessing of upload %s: student=%s exam=%s status=%s",
+            upload_id, upload['student_id'], upload['exam_id'], upload['processing_status']
+        )
         
         # Trigger auto-grading
-        await auto_grade_upload(upload_id, supabase_admin)
+        graded = await auto_grade_upload(upload_id, supabase_admin)
         
         return {
-            "message": "Reprocessing completed",
+            "message": "Reprocessing completed" if graded else "Reprocessing finished without grading any answers",
             "upload_id": upload_id,
-            "status": "success"
+            "status": "success" if graded else "failed"
         }
         
     except Exception as e:
-        print(f"❌ Reprocessing failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Reprocessing failed for upload %s", upload_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -647,50 +842,55 @@ async def regrade_all_uploads(exam_id: str):
     supabase_admin = get_supabase_admin()
     
     try:
-        # Get all processed uploads for this exam
-        uploads_result = supabase_admin.table("exam_uploads").select("id").eq(
+        # Get all processed uploads for this exam, and fetch the exam and
+        # questions once for every upload; the queries run concurrently
+        uploads_query = supabase_admin.table("exam_uploads").select("id").eq(
             "exam_id", exam_id
-        ).eq("processing_status", "processed").execute()
+        ).eq("processing_status", "processed")
+        uploads_result, (exam, questions) = await asyncio.gather(
+            asyncio.to_thread(uploads_query.execute),
+            asyncio.to_thread(_get_exam_and_questions, exam_id, supabase_admin)
+        )
         
         if not uploads_result.data:
             raise HTTPException(status_code=404, detail="No processed uploads found")
         
-        print(f"\n{'='*60}")
-        print(f"🔄 REGRADING ALL UPLOADS FOR EXAM: {exam_id}")
-        print(f"{'='*60}")
-        print(f"Found {len(uploads_result.data)} uploads to regrade")
+        logger.info("Regrading %d uploads for exam %s", len(uploads_result.data), exam_id)
         
-        results = []
+        # Regrade uploads concurrently, bounded to limit LLM/DB pressure
+        regrade_semaphore = asyncio.Semaphore(REGRADE_CONCURRENCY)
         
-        for upload in uploads_result.data:
-            upload_id = upload['id']
-            print(f"\n📝 Regrading upload: {upload_id}")
-            
-            try:
-                await auto_grade_upload(upload_id, supabase_admin)
-                results.append({
-                    "upload_id": upload_id,
-                    "status": "success"
-                })
-                print(f"✅ Success: {upload_id}")
-            except Exception as e:
-                print(f"❌ Failed: {upload_id} - {str(e)}")
-                results.append({
-                    "upload_id": upload_id,
-                    "status": "failed",
-                    "error": str(e)
-                })
+        async def _one(upload_id: str) -> Dict[str, Any]:
+            async with regrade_semaphore:
+                try:
+                    if not await auto_grade_upload(upload_id, supabase_admin, exam=exam, questions=questions):
+                        return {
+                            "upload_id": upload_id,
+                            "status": "failed",
+                            "error": "No answers were graded"
+                        }
+                    logger.debug("Regraded upload %s", upload_id)
+                    return {
+                        "upload_id": upload_id,
+                        "status": "success"
+                    }
+                except Exception as e:
+                    logger.error("Regrading upload %s failed: %s", upload_id, e)
+                    return {
+                        "upload_id": upload_id,
+                        "status": "failed",
+                        "error": str(e)
+                    }
+        
+        results = await asyncio.gather(*[_one(upload['id']) for upload in uploads_result.data])
         
         successful = len([r for r in results if r['status'] == 'success'])
         failed = len(results) - successful
         
-        print(f"\n{'='*60}")
-        print(f"📊 REGRADING SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total: {len(results)}")
-        print(f"Successful: {successful}")
-        print(f"Failed: {failed}")
-        print(f"{'='*60}\n")
+        logger.info(
+            "Regrading finished for exam %s: total=%d successful=%d failed=%d",
+            exam_id, len(results), successful, failed
+        )
         
         return {
             "exam_id": exam_id,
@@ -703,9 +903,7 @@ async def regrade_all_uploads(exam_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Regrade all failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Regrade all failed for exam %s", exam_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -715,50 +913,9 @@ async def get_exam_grading_status(exam_id: str):
     supabase_admin = get_supabase_admin()
     
     try:
-        # Get uploads
-        uploads = supabase_admin.table("exam_uploads").select("""
-            id,
-            student_id,
-            processing_status,
-            ocr_extracted_text,
-            students (student_id, full_name)
-        """).eq("exam_id", exam_id).execute()
-        
-        status_summary = []
-        
-        for upload in uploads.data:
-            student = supabase_admin.table("students").select("full_name").eq(
-        "id", upload["student_id"]
-    ).maybe_single().execute()
-            
-            status_summary.append({
-        "upload_id": upload["id"],
-        "student_id": upload["student_id"],
-        "student_name": student.data["full_name"] if student.data else None,
-        "processing_status": upload["processing_status"],
-        "has_ocr_text": len(upload.get("ocr_extracted_text", "")) > 0,
-        "student_answers_count": len(
-            supabase_admin.table("student_answers")
-            .select("id")
-            .eq("upload_id", upload["id"])
-            .execute().data
-        ),
-        "grading_results_count": len(
-            supabase_admin.table("grading_results")
-            .select("id")
-            .eq("exam_id", exam_id)
-            .eq("student_id", upload["student_id"])
-            .execute().data
-        ),
-        "is_graded": len(
-            supabase_admin.table("grading_results")
-            .select("id")
-            .eq("exam_id", exam_id)
-            .eq("student_id", upload["student_id"])
-            .execute().data
-        ) > 0
-            
-            })
+        # Counts are aggregated in the database (migrations/002_exam_grading_summary.sql)
+        summary = supabase_admin.rpc("exam_grading_summary", {"exam_uuid": exam_id}).execute()
+        status_summary = summary.data or []
         
         return {
             "exam_id": exam_id,
@@ -160,4 +160,16 @@ class AIGradingService:
         if low_scoring:
             feedback += f" Focus on questions: {', '.join([str(qr.question_number) for qr in low_scoring[:3]])}."
 
-        return f"{grade}: {feedback}"
\ No newline at end of file
+        return f"{grade}: {feedback}"
+
+
+# One embedding model per process, shared by every router and service and
+# loaded on first use so importing the app (e.g. in spawned OCR workers) stays cheap
+_shared_service = None
+
+
+def get_ai_grading_service() -> AIGradingService:
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = AIGradingService()
+    return _shared_service
@@ -5,7 +5,7 @@ from fastapi import HTTPException
 from app.core.config import settings
 from app.database.session import DatabaseSession
 from app.services.ocr_service import OCRService
-from app.services.ai_service import AIGradingService
+from app.services.ai_service import get_ai_grading_service
 from app.schema.grading import GradingResult, QuestionResult
 
 
@@ -13,7 +13,7 @@ class GradingService:
     def __init__(self, access_token: str = None):
         self.db_session = DatabaseSession(access_token or settings.SUPABASE_SERVICE_ROLE_KEY)
         self.ocr_service = OCRService()
-        self.ai_service = AIGradingService()
+        self.ai_service = get_ai_grading_service()
 
     async def grade_exam_session(
         self,
@@ -6,12 +6,26 @@ import cv2
 import numpy as np
 from typing import Dict, Any
 import fitz  # PyMuPDF
+import asyncio
 import io
+import logging
 import os
 import re
 import easyocr
 from paddleocr import PaddleOCR
 
+logger = logging.getLogger(__name__)
+
+# Answer parser patterns, compiled once at import
+_ANSWER_DIGIT_RE = re.compile(r"Answer(\d)")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Matches patterns like:
+#   Answer 1, Answer1., Answer:1, Answer 1:
+_ANSWER_RE = re.compile(
+    r"(?:Answer\s*[\.:]?\s*(\d+)[\.:]?\s*)(.*?)(?=Answer\s*\d+[\.:]?|$)",
+    flags=re.DOTALL | re.IGNORECASE,
+)
+
 
 class OCRService:
     def __init__(self):
@@ -194,12 +208,7 @@ class OCRService:
     # -------------------------------------------------------------------------
     async def extract_text_from_txt(self, file_path: str) -> Dict[str, Any]:
         """Extract text from TXT file."""
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-            return {"text": text.strip(), "confidence": 1.0, "status": "success"}
-        except Exception as e:
-            return {"text": "", "confidence": 0.0, "status": "error", "error": str(e)}
+        return read_text_file(file_path)
 
     # -------------------------------------------------------------------------
     # AUTO-DETECT FILE TYPE
@@ -303,33 +312,77 @@ class OCRService:
     # ANSWER PARSER
     # -------------------------------------------------------------------------
     def _parse_answers_botanical(self, text: str) -> Dict[str, str]:
-        """
-        Improved OCR text parser for AutoGrader.
-        Handles answers in continuous lines, missing colons, and inconsistent spacing.
-        Example text handled:
-        'Answer 1 JDK used for developing Java programs. JRE is runtime,JVM executes program Answer 2: ...'
-        """
-        import re
-
-        # --- Clean up OCR text ---
-        text = text.replace("EXAMINATI ON", "EXAMINATION")  # Fix OCR spacing error
-        text = re.sub(r"Answer(\d)", r"Answer \1", text)    # Ensure space after 'Answer'
-        text = re.sub(r"\s+", " ", text).strip()             # Normalize spaces
-
-        # --- Regex to match all answers in one go ---
-        # Matches patterns like:
-        #   Answer 1, Answer1., Answer:1, Answer 1:
-        pattern = r"(?:Answer\s*[\.:]?\s*(\d+)[\.:]?\s*)(.*?)(?=Answer\s*\d+[\.:]?|$)"
-        matches = re.findall(pattern, text, flags=re.DOTALL | re.IGNORECASE)
-
-        answers = {}
-        for num, ans in matches:
-            cleaned_answer = ans.strip()
-            if cleaned_answer:
-                answers[f"question_{num}"] = cleaned_answer
-
-        # --- Debug logs (visible in backend terminal) ---
-        print("🧾 CLEANED OCR TEXT PREVIEW:", text[:400])
-        print("✅ PARSED ANSWERS:", answers)
-
-        return answers
+        """Parse answers from OCR text (see parse_answers)."""
+        return parse_answers(text)
+
+
+# -------------------------------------------------------------------------
+# ANSWER PARSER
+# -------------------------------------------------------------------------
+def parse_answers(text: str) -> Dict[str, str]:
+    """
+    Improved OCR text parser for AutoGrader.
+    Handles answers in continuous lines, missing colons, and inconsistent spacing.
+    Example text handled:
+    'Answer 1 JDK used for developing Java programs. JRE is runtime,JVM executes program Answer 2: ...'
+    """
+    # --- Clean up OCR text ---
+    text = text.replace("EXAMINATI ON", "EXAMINATION")  # Fix OCR spacing error
+    text = _ANSWER_DIGIT_RE.sub(r"Answer \1", text)     # Ensure space after 'Answer'
+    text = _WHITESPACE_RE.sub(" ", text).strip()         # Normalize spaces
+
+    # --- Match all answers in one pass ---
+    matches = _ANSWER_RE.findall(text)
+
+    answers = {}
+    for num, ans in matches:
+        cleaned_answer = ans.strip()
+        if cleaned_answer:
+            answers[f"question_{num}"] = cleaned_answer
+
+    logger.debug("Cleaned OCR text preview: %r", text[:400])
+    logger.debug("Parsed answers: %s", answers)
+
+    return answers
+
+
+# -------------------------------------------------------------------------
+# TXT READER
+# -------------------------------------------------------------------------
+def read_text_file(file_path: str) -> Dict[str, Any]:
+    """Read a TXT answer sheet (no OCR needed)."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        return {"text": text.strip(), "confidence": 1.0, "status": "success"}
+    except Exception as e:
+        return {"text": "", "confidence": 0.0, "status": "error", "error": str(e)}
+
+
+# -------------------------------------------------------------------------
+# PROCESS-POOL ENTRY POINTS
+# -------------------------------------------------------------------------
+# Top-level functions so they can be pickled into a ProcessPoolExecutor.
+# Each worker process loads its own OCR models once, on first use.
+_worker_service = None
+
+
+def _get_worker_service() -> OCRService:
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = OCRService()
+    return _worker_service
+
+
+def run_image_ocr(file_path: str) -> Dict[str, Any]:
+    """Run image OCR synchronously inside a worker process."""
+    with open(file_path, "rb") as f:
+        image_data = f.read()
+    return asyncio.run(_get_worker_service().extract_text_from_image(image_data))
+
+
+def run_pdf_ocr(file_path: str) -> Dict[str, Any]:
+    """Run PDF text extraction/OCR synchronously inside a worker process."""
+    with open(file_path, "rb") as f:
+        pdf_data = f.read()
+    return asyncio.run(_get_worker_service().extract_text_from_pdf(pdf_data))
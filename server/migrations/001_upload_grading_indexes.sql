@@ -0,0 +1,12 @@
+-- Indexes for the upload and grading hot paths.
+-- Run in the Supabase SQL editor (or psql) against the project database.
+
+-- Student lookups by roll number (batch and ZIP uploads use .in_("student_id", ...)).
+-- Fails if duplicate student_id values already exist; resolve those first.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_students_student_id ON students(student_id);
+
+-- regrade_all_uploads: exam_uploads filtered by exam and processing status.
+CREATE INDEX IF NOT EXISTS idx_exam_uploads_exam_processing ON exam_uploads(exam_id, processing_status);
+
+-- auto_grade_upload: questions for an exam ordered by question number.
+CREATE INDEX IF NOT EXISTS idx_questions_exam_qnum ON questions(exam_id, question_number);
@@ -0,0 +1,32 @@
+-- Per-upload grading status for an exam, aggregated server-side.
+-- Used by GET /api/v1/exam/{exam_id}/grading-status.
+
+CREATE OR REPLACE FUNCTION exam_grading_summary(exam_uuid uuid)
+RETURNS TABLE (
+    upload_id uuid,
+    student_id uuid,
+    student_name text,
+    processing_status text,
+    has_ocr_text boolean,
+    student_answers_count int,
+    grading_results_count int,
+    is_graded boolean
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        eu.id,
+        eu.student_id,
+        s.full_name::text,
+        eu.processing_status::text,
+        coalesce(length(eu.ocr_extracted_text), 0) > 0,
+        (SELECT count(*) FROM student_answers sa WHERE sa.upload_id = eu.id)::int,
+        (SELECT count(*) FROM grading_results gr
+            WHERE gr.exam_id = eu.exam_id AND gr.student_id = eu.student_id)::int,
+        EXISTS (SELECT 1 FROM grading_results gr
+            WHERE gr.exam_id = eu.exam_id AND gr.student_id = eu.student_id)
+    FROM exam_uploads eu
+    LEFT JOIN students s ON s.id = eu.student_id
+    WHERE eu.exam_id = exam_uuid;
+$$;